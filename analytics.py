@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# Cross-sectional analytics (v1)
+# - Relative strength of every symbol vs an equal-weight NIFTY50 basket
+# - Rolling 60-day return correlation matrix, updated incrementally per new day
+# - Clusters of co-moving stocks (groups linked by correlation >= threshold)
+# - Results cached on disk keyed by the last date (newest CACHE_KEEP kept), plus
+#   the rolling correlation state for the latest date
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from scanner import NIFTY50, UNIVERSE, WORKERS, fetch_1y
+
+# ---------- Config ----------
+CORR_WINDOW = 60
+RS_LOOKBACK = 126          # ~6 months, same horizon as the scanner's ret_6m
+CLUSTER_MIN_CORR = 0.7
+REFRESH_EVERY = 250        # full recompute after this many incremental updates (limits float drift)
+CACHE_DIR = "analytics_cache"
+CACHE_KEEP = 5             # result pickles kept on disk (each holds an n x n corr matrix)
+
+
+# ---------- Panel ----------
+def closes_panel(symbols: list[str]) -> pd.DataFrame:
+    """Aligned Close matrix (dates x symbols) built from scanner.fetch_1y."""
+    with ThreadPoolExecutor(max_workers=WORKERS) as ex:
+        frames = dict(zip(symbols, ex.map(fetch_1y, symbols)))
+    cols = {s: df["Close"] for s, df in frames.items() if df is not None and not df.empty}
+    if not cols:
+        return pd.DataFrame()
+    return pd.DataFrame(cols).sort_index()
+
+
+def returns_matrix(closes: pd.DataFrame) -> pd.DataFrame:
+    """Daily log returns; first row dropped."""
+    return np.log(closes).diff().iloc[1:]
+
+
+# ---------- Relative strength ----------
+def relative_strength(closes: pd.DataFrame, lookback: int = RS_LOOKBACK,
+                      basket: list[str] = NIFTY50) -> pd.DataFrame:
+    """
+    Excess log return of each symbol over the equal-weight basket across the lookback,
+    with a 0-100 percentile rank (100 = strongest).
+    """
+    rets = returns_matrix(closes).iloc[-lookback:]
+    members = [s for s in basket if s in rets.columns]
+    if not members:
+        raise ValueError("No basket members in the panel.")
+    bench = rets[members].mean(axis=1).sum()
+    excess = rets.sum(axis=0, min_count=1) - bench
+    out = pd.DataFrame({"rs_excess_pct": 100.0 * np.expm1(excess)})
+    out["rs_rank"] = 100.0 * out["rs_excess_pct"].rank(pct=True)
+    return out.sort_values("rs_rank", ascending=False)
+
+
+# ---------- Rolling correlation ----------
+class RollingCorrelation:
+    """
+    Correlation over the last `window` return rows, kept as running sums:
+      s = sum(x), P = X^T X
+    so appending a day is a rank-2 update (add new row, drop oldest) done as one
+    n x 2 @ 2 x n product instead of a full X^T X. Missing returns count as 0.
+    """
+
+    def __init__(self, returns: pd.DataFrame, window: int = CORR_WINDOW):
+        if len(returns) < window:
+            raise ValueError(f"Need at least {window} return rows, got {len(returns)}.")
+        self.window = window
+        self.symbols = list(returns.columns)
+        self._rebuild(returns.iloc[-window:])
+
+    def _rebuild(self, tail: pd.DataFrame):
+        x = np.ascontiguousarray(tail.to_numpy(dtype=np.float64, na_value=0.0))
+        self.rows = x                      # window x n, oldest first (row 0)
+        self.dates = list(tail.index)
+        self.oldest = 0                    # ring position of the oldest row
+        self.s = x.sum(axis=0)
+        self.P = x.T @ x                   # BLAS gemm
+        self.updates = 0
+
+    @property
+    def last_date(self):
+        return self.dates[(self.oldest - 1) % self.window]
+
+    def append(self, date, row: pd.Series):
+        """Slide the window forward by one day."""
+        new = row.reindex(self.symbols).to_numpy(dtype=np.float64, na_value=0.0)
+        old = self.rows[self.oldest]
+        # P += new new^T - old old^T in one gemm (one n x n temporary, not two)
+        self.P += np.stack([new, -old], axis=1) @ np.stack([new, old])
+        self.s += new - old
+        self.rows[self.oldest] = new
+        self.dates[self.oldest] = date
+        self.oldest = (self.oldest + 1) % self.window
+        self.updates += 1
+        if self.updates >= REFRESH_EVERY:
+            order = (self.oldest + np.arange(self.window)) % self.window
+            ordered = [self.dates[i] for i in order]
+            self._rebuild(pd.DataFrame(self.rows[order], index=ordered, columns=self.symbols))
+
+    def matrix(self) -> pd.DataFrame:
+        w = self.window
+        cov = (self.P - np.outer(self.s, self.s) / w) / (w - 1)
+        sd = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(sd, sd)
+        np.clip(corr, -1.0, 1.0, out=corr)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
+
+# ---------- Clusters ----------
+def correlation_clusters(corr: pd.DataFrame, min_corr: float = CLUSTER_MIN_CORR) -> pd.Series:
+    """
+    Single-linkage clusters: symbols joined by any chain of pairs with corr >= min_corr.
+    Returns cluster id per symbol (0 = largest cluster); singletons get -1.
+    """
+    adj = corr.to_numpy() >= min_corr
+    n = len(adj)
+    labels = np.arange(n)
+    big = n
+    while True:
+        # each node takes the smallest label among its neighbours (connected components)
+        nxt = np.where(adj, labels[None, :], big).min(axis=1)
+        nxt = np.minimum(nxt, labels)
+        if np.array_equal(nxt, labels):
+            break
+        labels = nxt[nxt]
+    ids, inv, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    cluster = np.where(counts[inv] > 1, rank[inv], -1)
+    return pd.Series(cluster, index=corr.index, name="cluster")
+
+
+# ---------- Daily run with cache ----------
+class Analytics:
+    """
+    Holds rolling state between runs. run(closes) returns the cached result if the
+    panel's last date was already computed, slides the correlation window when the
+    panel gained exactly one day, and rebuilds otherwise.
+    The RollingCorrelation state is pickled next to the results (latest date only),
+    so the next day's run in a fresh process is still a rank-2 update.
+    """
+
+    def __init__(self, window: int = CORR_WINDOW, cache_dir: str | None = CACHE_DIR):
+        self.window = window
+        self.cache_dir = cache_dir
+        self.corr: RollingCorrelation | None = None
+
+    def _cache_path(self, last_date) -> str | None:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{pd.Timestamp(last_date):%Y-%m-%d}.pkl")
+
+    def _state_path(self, last_date) -> str | None:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{pd.Timestamp(last_date):%Y-%m-%d}.state.pkl")
+
+    def _load_state(self, rets: pd.DataFrame) -> RollingCorrelation | None:
+        """Saved state for the previous day (to slide) or for the last day itself."""
+        dates = [rets.index[-2], rets.index[-1]] if len(rets) >= 2 else [rets.index[-1]]
+        for d in dates:
+            p = self._state_path(d)
+            if p and os.path.exists(p):
+                c = pd.read_pickle(p)
+                if c.window == self.window and c.symbols == list(rets.columns) and c.last_date == d:
+                    return c
+        return None
+
+    def _save_state(self, c: RollingCorrelation):
+        p = self._state_path(c.last_date)
+        if not p:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pd.to_pickle(c, p + ".tmp")
+        os.replace(p + ".tmp", p)
+
+    def _prune(self):
+        """Keep the newest CACHE_KEEP result pickles and only the newest state (all n x n)."""
+        names = sorted(os.listdir(self.cache_dir), reverse=True)
+        states = [f for f in names if f.endswith(".state.pkl")]
+        results = [f for f in names if f.endswith(".pkl") and not f.endswith(".state.pkl")]
+        for f in states[1:] + results[CACHE_KEEP:]:
+            os.remove(os.path.join(self.cache_dir, f))
+
+    def run(self, closes: pd.DataFrame) -> dict:
+        rets = returns_matrix(closes)
+        last_date = rets.index[-1]
+        p = self._cache_path(last_date)
+        if p and os.path.exists(p):
+            cached = pd.read_pickle(p)
+            if list(cached["corr"].columns) == list(rets.columns):
+                return cached
+
+        if self.corr is None:
+            self.corr = self._load_state(rets)
+        c = self.corr
+        if (c is not None and c.symbols == list(rets.columns)
+                and len(rets) >= 2 and rets.index[-2] == c.last_date):
+            c.append(last_date, rets.iloc[-1])
+        elif c is None or c.last_date != last_date or c.symbols != list(rets.columns):
+            self.corr = c = RollingCorrelation(rets, self.window)
+
+        corr = c.matrix()
+        result = {
+            "date": last_date,
+            "rs": relative_strength(closes),
+            "corr": corr,
+            "clusters": correlation_clusters(corr),
+        }
+        if p:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pd.to_pickle(result, p)
+            self._save_state(c)
+            self._prune()
+        return result
+
+
+def main():
+    symbols = list(dict.fromkeys(UNIVERSE))
+    closes = closes_panel(symbols)
+    if closes.empty:
+        print("No data fetched. Try again.")
+        return
+    t0 = time.perf_counter()
+    res = Analytics().run(closes)
+    print(f"Analytics for {res['date']:%Y-%m-%d} ({closes.shape[1]} symbols) in {time.perf_counter() - t0:.2f}s\n")
+
+    print("Top 15 by relative strength vs NIFTY50 basket:")
+    for i, (sym, r) in enumerate(res["rs"].head(15).iterrows(), 1):
+        print(f"{i:2d}. {sym:<12}  excess: {r['rs_excess_pct']:>6.2f}%  rank: {r['rs_rank']:>5.1f}")
+
+    cl = res["clusters"]
+    print(f"\nCo-moving clusters (60d corr >= {CLUSTER_MIN_CORR}):")
+    groups = cl[cl >= 0].groupby(cl[cl >= 0]).groups
+    if not groups:
+        print("  (none)")
+    for cid, members in sorted(groups.items()):
+        print(f" - #{cid}: {', '.join(members)}")
+
+if __name__ == "__main__":
+    main()
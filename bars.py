@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# Intraday bar builder (v1)
+# - Input: stream of (symbol, price, volume, timestamp) quotes
+# - Keeps 1m/5m OHLCV bars per symbol in fixed-size ring buffers
+# - Session: NSE cash market 09:15–15:30 Asia/Kolkata on weekdays outside
+#   data_quality.NSE_HOLIDAYS; ticks outside are ignored
+# - Completed bars are flushed to the local HistoryStore in batches
+# - Run directly for a synthetic replay benchmark
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_quality import NSE_HOLIDAYS
+from history_store import HistoryStore
+
+# ---------- Config ----------
+INTERVALS = {"1m": 60, "5m": 300}
+RING_CAPACITY = 512        # bars kept in memory per symbol/interval (a session is 375 x 1m)
+FLUSH_EVERY = 2000         # completed bars pending before a batch write to the store
+IST_OFFSET = 19800         # Asia/Kolkata is UTC+05:30, no DST
+SESSION_OPEN = 9 * 3600 + 15 * 60
+SESSION_CLOSE = 15 * 3600 + 30 * 60
+DAY = 86400
+_session_days: dict[int, bool] = {}     # IST day number -> is a session day (cached)
+
+
+def is_session_day(day: int) -> bool:
+    """day = days since 1970-01-01 in IST. Weekday and not in NSE_HOLIDAYS."""
+    ok = _session_days.get(day)
+    if ok is None:
+        ok = (day + 3) % 7 < 5 and f"{pd.Timestamp(day, unit='D'):%Y-%m-%d}" not in NSE_HOLIDAYS
+        _session_days[day] = ok
+    return ok
+
+
+def in_session(ts: float) -> bool:
+    local = int(ts) + IST_OFFSET
+    return is_session_day(local // DAY) and SESSION_OPEN <= local % DAY < SESSION_CLOSE
+
+
+# ---------- Ring buffer ----------
+class BarRing:
+    """
+    Fixed-size OHLCV ring for one symbol/interval.
+    Arrays are allocated once; the forming bar lives in plain attributes
+    and is written into the arrays only when it completes.
+    """
+    __slots__ = ("step", "capacity", "ts", "ohlcv", "head", "count", "unflushed",
+                 "start", "done", "o", "h", "l", "c", "v")
+
+    def __init__(self, step: int, capacity: int = RING_CAPACITY):
+        self.step = step
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.int64)           # bar start, epoch seconds
+        self.ohlcv = np.zeros((capacity, 5), dtype=np.float64)
+        self.head = 0          # next slot to write
+        self.count = 0         # completed bars held (<= capacity)
+        self.unflushed = 0     # completed bars not yet written to the store
+        self.start = -1        # start of the forming bar, -1 if none
+        self.done = -1         # start of the last completed bar (ticks at or before it are late)
+        self.o = self.h = self.l = self.c = self.v = 0.0
+
+    def complete(self):
+        """Move the forming bar into the ring."""
+        i = self.head
+        self.ts[i] = self.start
+        row = self.ohlcv[i]
+        row[0] = self.o; row[1] = self.h; row[2] = self.l; row[3] = self.c; row[4] = self.v
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.unflushed += 1
+        self.done = self.start
+        self.start = -1
+
+    def _frame(self, n: int) -> pd.DataFrame:
+        idx = (self.head - n + np.arange(n)) % self.capacity
+        df = pd.DataFrame(self.ohlcv[idx], columns=["Open", "High", "Low", "Close", "Volume"])
+        df.index = pd.to_datetime(self.ts[idx], unit="s", utc=True).tz_convert("Asia/Kolkata")
+        return df
+
+    def tail(self, n: int | None = None) -> pd.DataFrame:
+        """Last n completed bars (all held bars if n is None), oldest first."""
+        n = self.count if n is None else min(n, self.count)
+        return self._frame(n)
+
+    def take_unflushed(self) -> pd.DataFrame:
+        df = self._frame(self.unflushed)
+        self.unflushed = 0
+        return df
+
+
+# ---------- Builder ----------
+class BarBuilder:
+    """Aggregate quotes into session-aligned bars for every symbol seen."""
+
+    def __init__(self, intervals: dict = INTERVALS, capacity: int = RING_CAPACITY,
+                 store: HistoryStore | None = None, flush_every: int = FLUSH_EVERY):
+        self.intervals = dict(intervals)
+        self.capacity = capacity
+        self.store = store
+        self.flush_every = flush_every
+        self.rings: dict[str, list[tuple[str, BarRing]]] = {}
+        self.pending = 0       # completed bars not yet flushed, across all rings
+        self.dropped = 0       # ticks outside the session or late for their bar
+
+    def _rings_for(self, symbol: str) -> list[tuple[str, BarRing]]:
+        rings = self.rings.get(symbol)
+        if rings is None:
+            rings = [(name, BarRing(step, self.capacity)) for name, step in self.intervals.items()]
+            self.rings[symbol] = rings
+        return rings
+
+    def _complete(self, symbol: str, name: str, ring: BarRing):
+        # never overwrite bars the store hasn't seen yet
+        if ring.unflushed >= ring.capacity:
+            self._flush_ring(symbol, name, ring)
+        ring.complete()
+        self.pending += 1
+
+    def on_quote(self, symbol: str, price: float, volume: float, ts) -> bool:
+        """
+        Feed one quote. ts is epoch seconds (or a tz-aware datetime).
+        volume is the traded quantity for this tick, not a running total.
+        Returns False if the tick was dropped (outside the session, or late for a
+        bar that is already forming past it or completed); a dropped tick touches no ring.
+        """
+        if isinstance(ts, datetime):
+            ts = ts.timestamp()
+        ts = int(ts)
+        local = ts + IST_OFFSET
+        sod = local % DAY
+        if sod < SESSION_OPEN or sod >= SESSION_CLOSE or not is_session_day(local // DAY):
+            self.dropped += 1
+            return False
+        since_open = sod - SESSION_OPEN
+
+        # decide lateness once, for every interval, so 1m and 5m never disagree
+        rings = self._rings_for(symbol)
+        for name, ring in rings:
+            start = ts - since_open % ring.step
+            if start < ring.start or start <= ring.done:
+                self.dropped += 1
+                return False
+
+        for name, ring in rings:
+            start = ts - since_open % ring.step
+            if start != ring.start:
+                if ring.start >= 0:
+                    self._complete(symbol, name, ring)
+                ring.start = start
+                ring.o = ring.h = ring.l = ring.c = price
+                ring.v = volume
+            else:
+                if price > ring.h:
+                    ring.h = price
+                elif price < ring.l:
+                    ring.l = price
+                ring.c = price
+                ring.v += volume
+
+        if self.pending >= self.flush_every:
+            self.flush()
+        return True
+
+    def advance(self, ts):
+        """Complete every forming bar that has ended by ts (call periodically when ticks are sparse)."""
+        if isinstance(ts, datetime):
+            ts = ts.timestamp()
+        for symbol, rings in self.rings.items():
+            for name, ring in rings:
+                if ring.start >= 0 and ring.start + ring.step <= ts:
+                    self._complete(symbol, name, ring)
+        if self.pending >= self.flush_every:
+            self.flush()
+
+    def close_session(self):
+        """Complete all forming bars (the last bar ends at 15:30) and flush everything."""
+        self.advance(float("inf"))
+        self.flush()
+
+    def _flush_ring(self, symbol: str, name: str, ring: BarRing):
+        n = ring.unflushed
+        if n == 0:
+            return
+        if self.store is None:
+            ring.unflushed = 0
+        else:
+            self.store.append_bars(symbol, name, ring.take_unflushed())
+        self.pending -= n
+
+    def flush(self):
+        """Write all completed-but-unflushed bars to the store."""
+        for symbol, rings in self.rings.items():
+            for name, ring in rings:
+                self._flush_ring(symbol, name, ring)
+        self.pending = 0
+
+    def bars(self, symbol: str, interval: str = "1m", n: int | None = None) -> pd.DataFrame:
+        """Completed bars still held in memory for symbol/interval."""
+        for name, ring in self.rings.get(symbol, []):
+            if name == interval:
+                return ring.tail(n)
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+
+
+# ---------- Live polling ----------
+def poll_live(symbols: list[str], builder: BarBuilder, every: float = 5.0):
+    """
+    Poll NSE LTP for each symbol until the session closes, feeding the builder.
+    Returns straight away on weekends / NSE_HOLIDAYS. One warmed NSE session is
+    reused for every poll (re-warmed if a whole cycle gets no prices).
+    The quote API gives no per-tick volume, so polled bars carry Volume = 0.
+    """
+    from nse_research_app import get_live_price_nse, warm_nse_session
+
+    if not is_session_day((int(time.time()) + IST_OFFSET) // DAY):
+        return
+    s = warm_nse_session()
+    while True:
+        now = time.time()
+        if (int(now) + IST_OFFSET) % DAY >= SESSION_CLOSE:
+            break
+        if in_session(now):
+            got = 0
+            for sym in symbols:
+                p = get_live_price_nse(sym, session=s)
+                if p is not None:
+                    got += 1
+                    builder.on_quote(sym, p, 0.0, time.time())
+            builder.advance(time.time())
+            if symbols and not got:
+                s = warm_nse_session()
+        time.sleep(every)
+    builder.close_session()
+
+
+# ---------- Replay benchmark ----------
+def synthetic_ticks(n_symbols: int = 50, n_ticks: int = 500_000, seed: int = 7):
+    """Random-walk quotes spread across one session, in time order."""
+    rng = np.random.default_rng(seed)
+    day0 = 1_704_067_200 - IST_OFFSET            # 2024-01-01 00:00 IST
+    ts = np.sort(rng.uniform(SESSION_OPEN, SESSION_CLOSE, n_ticks)) + day0
+    sym_idx = rng.integers(0, n_symbols, n_ticks)
+    steps = rng.normal(0.0, 0.0005, n_ticks)
+    prices = 1000.0 * np.exp(np.cumsum(steps))
+    vols = rng.integers(1, 500, n_ticks).astype(np.float64)
+    names = [f"SYM{i:04d}" for i in range(n_symbols)]
+    return [names[i] for i in sym_idx.tolist()], prices.tolist(), vols.tolist(), ts.tolist()
+
+
+def replay_benchmark(n_symbols: int = 50, n_ticks: int = 500_000) -> float:
+    syms, prices, vols, ts = synthetic_ticks(n_symbols, n_ticks)
+    builder = BarBuilder()
+    on_quote = builder.on_quote
+    t0 = time.perf_counter()
+    for s, p, v, t in zip(syms, prices, vols, ts):
+        on_quote(s, p, v, t)
+    builder.close_session()
+    dt = time.perf_counter() - t0
+    rate = n_ticks / dt
+    print(f"Replayed {n_ticks:,} ticks for {n_symbols} symbols in {dt:.2f}s  ({rate:,.0f} ticks/s)")
+    return rate
+
+
+def check_late_ticks():
+    """Late ticks must not reopen a completed bar or split 1m and 5m apart."""
+    open_ts = 1_704_067_200 - IST_OFFSET + SESSION_OPEN          # 2024-01-01 09:15 IST
+    b = BarBuilder()
+    b.on_quote("X", 100.0, 10, open_ts)
+    b.on_quote("X", 105.0, 10, open_ts + 30)
+    b.advance(open_ts + 61)
+    assert not b.on_quote("X", 99.0, 1, open_ts + 50), "tick for a completed bar was accepted"
+    b.on_quote("X", 101.0, 5, open_ts + 125)                      # 09:17 bar forming
+    assert not b.on_quote("X", 98.0, 1, open_ts + 70), "tick behind the forming 1m bar was accepted"
+    assert b.dropped == 2
+    b.close_session()
+    m1, m5 = b.bars("X", "1m"), b.bars("X", "5m")
+    assert len(m1) == 2 and m1.index.is_unique
+    assert m1.iloc[0].tolist() == [100.0, 105.0, 100.0, 105.0, 20.0]
+    assert m5.iloc[0].tolist() == [100.0, 105.0, 100.0, 101.0, 25.0]
+    assert m1["Volume"].sum() == m5["Volume"].sum()
+    # 2024-01-06 is a Saturday: same time of day, no session
+    assert not b.on_quote("X", 100.0, 1, open_ts + 5 * DAY) and not in_session(open_ts + 5 * DAY)
+
+
+def main():
+    check_late_ticks()
+    replay_benchmark()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# Data-quality pass over fetched daily histories (v1)
+# - One vectorized pass over the aligned panel (dates x symbols), no per-symbol loops
+# - Flags per symbol: calendar gaps, off-calendar bars, stale repeated closes,
+#   zero-volume days, broken OHLC, bad ticks (one-day spikes that revert)
+# - Optional repair: "ffill" (fix onto the calendar) or "drop" (remove flagged rows)
+# - Quality score = 1 - flagged days / expected trading days; low scores are excluded
+import numpy as np
+import pandas as pd
+
+# ---------- Config ----------
+NSE_HOLIDAYS: set[str] = set()   # e.g. {"2025-03-14", ...}; weekday closures not visible in the data
+CALENDAR_QUORUM = 0.5      # weekday is a session if this share of symbols whose history spans it has a bar
+STALE_RUN = 3              # same close this many sessions in a row = stale
+SPIKE_WINDOW = 21          # rolling window for the typical (mean) |return|
+SPIKE_SIGMA = 8.0          # bad tick if |return| > SPIKE_SIGMA x typical and reverts next day
+SPIKE_FLOOR = 0.005        # minimum typical |return| (stops quiet stocks tripping the check)
+MIN_QUALITY = 0.9          # scanner skips symbols whose quality score is below this
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+FLAGS = ["gap", "off_calendar", "stale", "zero_volume", "bad_ohlc", "bad_tick"]
+
+
+def _rolling_sum(a: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sum over axis 0 (cumsum trick; first window-1 rows are partial)."""
+    cs = np.cumsum(a, axis=0)
+    cs[window:] -= cs[:-window].copy()
+    return cs
+
+
+class Panel:
+    """Aligned histories as one float cube: dates x FIELDS x symbols (NaN = no bar)."""
+
+    def __init__(self, index: pd.DatetimeIndex, symbols: list[str], cube: np.ndarray):
+        self.index = index
+        self.symbols = symbols
+        self.cube = cube
+
+    def field(self, name: str) -> np.ndarray:
+        return self.cube[:, FIELDS.index(name), :]
+
+    def frame(self, name: str) -> pd.DataFrame:
+        return pd.DataFrame(self.field(name), index=self.index, columns=self.symbols)
+
+
+def build_panel(frames: dict[str, pd.DataFrame]) -> Panel:
+    """Align per-symbol OHLCV frames onto the union of their dates."""
+    frames = {s: df for s, df in frames.items() if df is not None and not df.empty}
+    index = pd.DatetimeIndex([])
+    for df in frames.values():
+        index = index.union(df.index) if not index.equals(df.index) else index
+    cube = np.full((len(index), len(FIELDS), len(frames)), np.nan)
+    for j, df in enumerate(frames.values()):
+        vals = (df if list(df.columns) == FIELDS else df[FIELDS]).to_numpy(dtype=np.float64)
+        if len(df) == len(index) and df.index.equals(index):
+            cube[:, :, j] = vals
+        else:
+            cube[index.get_indexer(df.index), :, j] = vals
+    return Panel(index, list(frames), cube)
+
+
+def _span(present: np.ndarray) -> np.ndarray:
+    """True from each symbol's first bar through its last bar."""
+    return np.maximum.accumulate(present, axis=0) & np.maximum.accumulate(present[::-1], axis=0)[::-1]
+
+
+def weekday_sessions(index: pd.DatetimeIndex) -> np.ndarray:
+    """Dates that can be NSE sessions at all: weekdays not in NSE_HOLIDAYS."""
+    ok = np.asarray(index.dayofweek < 5)
+    if NSE_HOLIDAYS:
+        ok &= ~index.normalize().isin(pd.to_datetime(sorted(NSE_HOLIDAYS)))
+    return ok
+
+
+def trading_calendar(panel: Panel, quorum: float = CALENDAR_QUORUM) -> pd.DatetimeIndex:
+    """
+    NSE sessions seen in the panel: possible session days where most symbols whose
+    history spans the date have a bar (per-symbol trims don't thin out early dates).
+    """
+    present = ~np.isnan(panel.field("Close"))
+    spanning = _span(present).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(spanning > 0, present.sum(axis=1) / spanning, 0.0)
+    return panel.index[weekday_sessions(panel.index) & (share >= quorum)]
+
+
+def assess(panel: Panel, calendar: pd.DatetimeIndex | None = None) -> tuple[dict[str, np.ndarray], pd.DataFrame]:
+    """
+    Flag issues for every symbol at once.
+    Returns (flags, report): flags maps FLAGS name -> bool array (dates x symbols),
+    report has per-symbol counts and quality_score.
+    """
+    if calendar is None:
+        calendar = trading_calendar(panel)
+    cal = panel.index.isin(calendar)[:, None]
+    o, h, l, c, v = (panel.field(f) for f in FIELDS)
+    present = ~np.isnan(c)
+    listed = np.maximum.accumulate(present, axis=0)        # on/after the symbol's first bar
+
+    c_prev = pd.DataFrame(c).ffill().shift(1).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.log(c / c_prev)
+    ret[~present] = np.nan
+
+    same = (present & (c == c_prev)).astype(np.float64)
+    stale = _rolling_sum(same, STALE_RUN - 1) >= STALE_RUN - 1
+
+    # typical |return| over the previous SPIKE_WINDOW bars (excludes the bar being tested)
+    absr = np.abs(ret)
+    seen = ~np.isnan(absr)
+    total = _rolling_sum(np.where(seen, absr, 0.0), SPIKE_WINDOW)
+    count = _rolling_sum(seen.astype(np.float64), SPIKE_WINDOW)
+    typical = np.full_like(absr, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        typical[1:] = np.where(count >= 5, total / count, np.nan)[:-1]
+    limit = SPIKE_SIGMA * np.fmax(typical, SPIKE_FLOOR)
+    ret_next = pd.DataFrame(ret).bfill().shift(-1).to_numpy()
+    with np.errstate(invalid="ignore"):
+        bad_tick = ((np.abs(ret) > limit) & (np.abs(ret_next) > limit)
+                    & (np.sign(ret) != np.sign(ret_next))
+                    & (np.abs(ret + ret_next) < 0.5 * np.abs(ret)))
+        bad_ohlc = present & ((h < np.fmax(o, c)) | (l > np.fmin(o, c)) | (l <= 0) | (c <= 0))
+        zero_vol = present & ~(v > 0)
+
+    # a bar on a thin weekday is kept as-is; only weekend/holiday bars are misaligned
+    flags = {
+        "gap": cal & listed & ~present,
+        "off_calendar": present & ~weekday_sessions(panel.index)[:, None],
+        "stale": stale & present,
+        "zero_volume": zero_vol,
+        "bad_ohlc": bad_ohlc,
+        "bad_tick": bad_tick & present,
+    }
+    any_flag = np.logical_or.reduce(list(flags.values()))
+    expected = (cal & listed).sum(axis=0)
+    report = pd.DataFrame({k: a.sum(axis=0) for k, a in flags.items()}, index=panel.symbols)
+    report["expected_days"] = expected
+    with np.errstate(divide="ignore", invalid="ignore"):
+        report["quality_score"] = np.where(expected > 0, 1.0 - any_flag.sum(axis=0) / expected, 0.0).clip(0.0, 1.0)
+    return flags, report
+
+
+def repair(panel: Panel, flags: dict[str, np.ndarray], calendar: pd.DatetimeIndex,
+           how: str = "ffill") -> Panel:
+    """
+    ffill: drop off-calendar bars, blank bad ticks / broken OHLC, then forward-fill
+           calendar days between a symbol's first and last real bar (a filled bar is
+           flat at the last good close, Volume 0). Nothing is invented past the last bar.
+    drop:  blank every flagged row for that symbol (removed when frames are split out).
+    """
+    if how not in {"ffill", "drop"}:
+        raise ValueError(f"Unknown repair {how!r}; expected 'ffill' or 'drop'")
+    cube = panel.cube.copy()
+    if how == "drop":
+        bad = np.logical_or.reduce([flags[k] for k in FLAGS if k != "gap"])
+        cube[np.broadcast_to(bad[:, None, :], cube.shape)] = np.nan
+        return Panel(panel.index, panel.symbols, cube)
+
+    bad = flags["bad_tick"] | flags["bad_ohlc"] | flags["off_calendar"]
+    ci, vi = FIELDS.index("Close"), FIELDS.index("Volume")
+    present = ~np.isnan(cube[:, ci, :])
+    live = _span(present)
+    cube[np.broadcast_to(bad[:, None, :], cube.shape)] = np.nan
+    on_cal = panel.index.isin(calendar)
+    rows = on_cal | (present & ~bad).any(axis=1)
+    cube, live, on_cal = cube[rows], live[rows], on_cal[rows]
+    close = pd.DataFrame(cube[:, ci, :]).ffill().to_numpy()
+    for i, f in enumerate(FIELDS):
+        a = cube[:, i, :]
+        fill = np.isnan(a) & live & on_cal[:, None]
+        if i == vi:
+            a[fill] = 0.0
+        else:
+            np.copyto(a, close, where=fill)
+    return Panel(panel.index[rows], panel.symbols, cube)
+
+
+def split_panel(panel: Panel, symbols=None) -> dict[str, pd.DataFrame]:
+    """Back to per-symbol OHLCV frames (rows without a Close dropped)."""
+    has_close = ~np.isnan(panel.field("Close"))
+    keep = set(panel.symbols if symbols is None else symbols)
+    by_symbol = np.ascontiguousarray(panel.cube.transpose(2, 0, 1))
+    frames = {}
+    for j, s in enumerate(panel.symbols):
+        if s not in keep:
+            continue
+        rows = has_close[:, j]
+        if rows.all():
+            frames[s] = pd.DataFrame(by_symbol[j], index=panel.index, columns=FIELDS, copy=False)
+        else:
+            frames[s] = pd.DataFrame(by_symbol[j][rows], index=panel.index[rows], columns=FIELDS, copy=False)
+    return frames
+
+
+def quality_pass(frames: dict[str, pd.DataFrame], repair_how: str | None = "ffill",
+                 min_score: float = MIN_QUALITY) -> tuple[dict[str, pd.DataFrame], pd.DataFrame]:
+    """
+    Assess (and optionally repair) all histories together.
+    Returns (kept frames, report); symbols below min_score are left out of the frames.
+    """
+    panel = build_panel(frames)
+    if not panel.symbols:
+        return {}, pd.DataFrame(columns=FLAGS + ["expected_days", "quality_score", "excluded"])
+    calendar = trading_calendar(panel)
+    flags, report = assess(panel, calendar)
+    if repair_how:
+        panel = repair(panel, flags, calendar, repair_how)
+    report["excluded"] = report["quality_score"] < min_score
+    return split_panel(panel, report.index[~report["excluded"]]), report
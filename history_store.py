@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# Local history store (v2)
+# - One CSV per (interval, symbol) under HISTORY_DIR, e.g. history/1m/TCS.csv
+# - Append-only writes so frequent intraday flushes stay cheap
+# - Index is the bar start time (Asia/Kolkata); daily bars are plain dates
+# - Daily bars are stored RAW (as traded). Splits/dividends live next to them:
+#     history/actions/SYM.csv  -> Dividends, Stock Splits per ex-date
+#     history/factors/SYM.csv  -> cumulative adjustment factors per ex-date
+#     history/synced/SYM.csv   -> last session cutoff a sync was completed for
+#   Adjusted series are computed on read, so a new action only rewrites that
+#   symbol's factor file instead of forcing a full re-download.
+import os
+from datetime import timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pytz
+
+import transport
+
+# ---------- Config ----------
+HISTORY_DIR = "history"
+BAR_COLS = ["Open", "High", "Low", "Close", "Volume"]
+PRICE_COLS = ["Open", "High", "Low", "Close"]
+ACTION_COLS = ["Dividends", "Stock Splits"]
+FACTOR_COLS = ["price_factor", "split_factor"]
+DAILY_PERIOD = "2y"        # first download per symbol; later syncs only fetch new days
+TZ = pytz.timezone("Asia/Kolkata")
+
+
+class HistoryStore:
+    """Tiny file-backed OHLCV store, keyed by symbol and bar interval."""
+
+    def __init__(self, root: str | None = None):
+        self.root = root       # None = HISTORY_DIR, or the archive's store in record/replay
+
+    def path(self, symbol: str, interval: str) -> str:
+        root = self.root or transport.history_dir(HISTORY_DIR)
+        return os.path.join(root, interval, f"{symbol}.csv")
+
+    def append_bars(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """Append bars (index = bar start) to the symbol's file. Returns rows written."""
+        if df is None or df.empty:
+            return 0
+        p = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        new_file = not os.path.exists(p)
+        df[BAR_COLS].to_csv(p, mode="a", header=new_file, index_label="Datetime")
+        return len(df)
+
+    def _read(self, p: str) -> Optional[pd.DataFrame]:
+        if not os.path.exists(p):
+            return None
+        df = pd.read_csv(p, index_col=0)
+        idx = pd.to_datetime(df.index)
+        if idx.tz is not None:
+            idx = idx.tz_convert(TZ)
+        df.index = idx
+        return df[~df.index.duplicated(keep="last")].sort_index()
+
+    def read_bars(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        """Load everything stored for symbol/interval (None if nothing stored yet)."""
+        return self._read(self.path(symbol, interval))
+
+    # ---- corporate actions / factors (daily bars) ----
+
+    def read_actions(self, symbol: str) -> pd.DataFrame:
+        df = self._read(self.path(symbol, "actions"))
+        return pd.DataFrame(columns=ACTION_COLS, dtype=float) if df is None else df
+
+    def read_factors(self, symbol: str) -> pd.DataFrame:
+        df = self._read(self.path(symbol, "factors"))
+        return pd.DataFrame(columns=FACTOR_COLS, dtype=float) if df is None else df
+
+    def _rewrite(self, symbol: str, kind: str, df: pd.DataFrame):
+        p = self.path(symbol, kind)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        tmp = p + ".tmp"
+        df.to_csv(tmp, index_label="Date")
+        os.replace(tmp, p)
+
+    def write_actions(self, symbol: str, actions: pd.DataFrame):
+        self._rewrite(symbol, "actions", actions[ACTION_COLS])
+
+    def write_factors(self, symbol: str, steps: pd.DataFrame):
+        self._rewrite(symbol, "factors", steps[FACTOR_COLS])
+
+    def synced_through(self, symbol: str) -> Optional[pd.Timestamp]:
+        """Cutoff of the last completed sync attempt (even one that found no bars)."""
+        p = self.path(symbol, "synced")
+        if not os.path.exists(p):
+            return None
+        with open(p) as f:
+            return pd.Timestamp(f.read().strip())
+
+    def mark_synced(self, symbol: str, cutoff: pd.Timestamp):
+        p = self.path(symbol, "synced")
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        with open(p, "w") as f:
+            f.write(f"{cutoff:%Y-%m-%d}\n")
+
+    def daily(self, symbol: str, adjust: str | None = "all") -> Optional[pd.DataFrame]:
+        """
+        Daily bars for symbol.
+        adjust: None = raw, "splits" = split-adjusted only (Yahoo's auto_adjust=False),
+                "all" = splits + dividends (Yahoo's auto_adjust=True).
+        """
+        raw = self.read_bars(symbol, "1d")
+        if raw is not None and transport.MODE == "replay":
+            raw = raw[raw.index <= last_closed_session()]     # nothing past the recording
+        if raw is None or raw.empty or adjust is None:
+            return raw
+        steps = self.read_factors(symbol)
+        if steps.empty:
+            return raw
+        price_f, split_f = expand_factors(steps, raw.index)
+        f = price_f if adjust == "all" else split_f
+        out = raw.copy()
+        out[PRICE_COLS] = raw[PRICE_COLS].to_numpy() * f[:, None]
+        out["Volume"] = raw["Volume"].to_numpy() / split_f
+        return out
+
+
+STORE = HistoryStore()
+
+
+# ---------- Adjustment factors ----------
+def _split_ratio(actions: pd.DataFrame) -> np.ndarray:
+    r = actions["Stock Splits"].fillna(0.0).to_numpy(dtype=np.float64)
+    return np.where(r > 0, r, 1.0)
+
+
+def factor_steps(raw_close: pd.Series, actions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cumulative factors keyed by ex-date: bars dated before an ex-date are
+    multiplied by that row's factors (product over it and every later action).
+    Dividend factor uses the previous raw close: 1 - D / close[t-1].
+    """
+    acts = actions[(actions["Dividends"].fillna(0) > 0) | (actions["Stock Splits"].fillna(0) > 0)].sort_index()
+    if acts.empty:
+        return pd.DataFrame(columns=FACTOR_COLS, dtype=float)
+    closes = raw_close.to_numpy(dtype=np.float64)
+    pos = raw_close.index.searchsorted(acts.index, side="left") - 1
+    prev = np.where(pos >= 0, closes[np.clip(pos, 0, None)], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        div_m = 1.0 - acts["Dividends"].fillna(0.0).to_numpy() / prev
+    div_m = np.where(np.isfinite(div_m) & (div_m > 0), div_m, 1.0)
+    split_m = 1.0 / _split_ratio(acts)
+    price_m = div_m * split_m
+    return pd.DataFrame({
+        "price_factor": np.cumprod(price_m[::-1])[::-1],
+        "split_factor": np.cumprod(split_m[::-1])[::-1],
+    }, index=acts.index)
+
+
+def expand_factors(steps: pd.DataFrame, index: pd.DatetimeIndex) -> tuple[np.ndarray, np.ndarray]:
+    """Per-bar (price, split) factors for index from the stored steps."""
+    i = steps.index.searchsorted(index, side="right")
+    price_f = np.append(steps["price_factor"].to_numpy(dtype=np.float64), 1.0)[i]
+    split_f = np.append(steps["split_factor"].to_numpy(dtype=np.float64), 1.0)[i]
+    return price_f, split_f
+
+
+def _unsplit(bars: pd.DataFrame, actions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Yahoo's unadjusted bars (and dividends) are still split-adjusted.
+    Undo splits dated after each row so what we store is what actually traded.
+    """
+    splits = actions[actions["Stock Splits"].fillna(0) > 0]
+    if splits.empty or bars.empty:
+        return bars
+    steps = pd.DataFrame({"price_factor": 1.0, "split_factor": np.cumprod((1.0 / _split_ratio(splits))[::-1])[::-1]},
+                         index=splits.index.sort_values())
+    _, split_f = expand_factors(steps, bars.index)
+    out = bars.copy()
+    cols = [c for c in PRICE_COLS + ["Dividends"] if c in out.columns]
+    out[cols] = out[cols].to_numpy() / split_f[:, None]
+    if "Volume" in out.columns:
+        out["Volume"] = out["Volume"].to_numpy() * split_f
+    return out
+
+
+# ---------- Sync from Yahoo ----------
+def last_closed_session() -> pd.Timestamp:
+    """Most recent weekday whose session (till 15:30 IST) is over. Holidays are not known."""
+    now = transport.now(TZ)
+    d = now.date() if (now.hour, now.minute) >= (15, 30) else now.date() - timedelta(days=1)
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return pd.Timestamp(d)
+
+
+def _flatten(raw: pd.DataFrame, ysym: str) -> pd.DataFrame:
+    if isinstance(raw.columns, pd.MultiIndex):
+        try:
+            if ysym in raw.columns.get_level_values(-1):
+                raw = raw.xs(ysym, axis=1, level=-1)
+            else:
+                raw.columns = raw.columns.get_level_values(0)
+        except Exception:
+            raw.columns = raw.columns.get_level_values(0)
+    keep = [c for c in BAR_COLS + ACTION_COLS if c in raw.columns]
+    df = raw[keep].sort_index().copy()
+    for c in keep:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    for c in ACTION_COLS:
+        df[c] = df[c].fillna(0.0) if c in df.columns else 0.0
+    df = df.dropna(subset=[c for c in BAR_COLS if c in df.columns])
+    idx = pd.DatetimeIndex(df.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    df.index = idx.normalize()
+    return df
+
+
+def sync_daily(symbol: str, store: HistoryStore = STORE) -> bool:
+    """
+    Bring the raw daily store for symbol up to the last closed session.
+    First call downloads DAILY_PERIOD; later calls fetch only the missing days.
+    New splits/dividends rewrite just this symbol's actions + factors.
+    Each symbol is tried at most once per cutoff: holidays (weekdays with no
+    session), suspended and delisted names don't re-download on every call.
+    Returns False if nothing could be fetched and nothing is stored.
+    """
+    ysym = f"{symbol}.NS"
+    raw = store.read_bars(symbol, "1d")
+    have = raw is not None and not raw.empty
+    cutoff = last_closed_session()
+    synced = store.synced_through(symbol)
+    if (have and raw.index[-1] >= cutoff) or (synced is not None and synced >= cutoff):
+        return have
+    if have:
+        kwargs = {"start": (raw.index[-1] + pd.Timedelta(days=1)).strftime("%Y-%m-%d")}
+    else:
+        kwargs = {"period": DAILY_PERIOD}
+
+    got, answered = None, False
+    for attempt in range(3):
+        try:
+            got = transport.download(ysym, interval="1d", auto_adjust=False, actions=True,
+                                     progress=False, threads=False, **kwargs)
+            answered = True
+            # empty for a start= range just means no new bars yet; only a first download retries
+            if have or (got is not None and not got.empty):
+                break
+        except Exception:
+            pass
+        transport.sleep(0.6)
+    if answered:
+        store.mark_synced(symbol, cutoff)
+    if got is None or got.empty:
+        return have
+
+    df = _flatten(got, ysym)
+    df = df[df.index <= cutoff]          # skip today's bar while it is still forming
+    if raw is not None and not raw.empty:
+        df = df[df.index > raw.index[-1]]
+    if df.empty:
+        return raw is not None and not raw.empty
+
+    acts = df.loc[(df["Dividends"] > 0) | (df["Stock Splits"] > 0), ACTION_COLS]
+    df = _unsplit(df, acts)
+    store.append_bars(symbol, "1d", df[BAR_COLS])
+    if not acts.empty:
+        acts = acts.assign(Dividends=df.loc[acts.index, "Dividends"])
+        old = store.read_actions(symbol)
+        merged = pd.concat([old, acts])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        store.write_actions(symbol, merged)
+        full = store.read_bars(symbol, "1d")
+        store.write_factors(symbol, factor_steps(full["Close"], merged))
+    return True
+
+
+def daily_bars(symbol: str, adjust: str | None = "all", store: HistoryStore = STORE) -> Optional[pd.DataFrame]:
+    """Sync then read; the one entry point the app and the scanner share."""
+    if not sync_daily(symbol, store):
+        return None
+    return store.daily(symbol, adjust)
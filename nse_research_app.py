@@ -15,10 +15,12 @@ from typing import Optional
 
 import requests
 import pandas as pd
-import yfinance as yf
 import matplotlib.pyplot as plt
 import pytz
 
+import transport
+from history_store import daily_bars
+
 # --- basic settings ---
 TZ = pytz.timezone("Asia/Kolkata")
 UA = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -39,7 +41,7 @@ def fetch_symbol_master(timeout=20) -> pd.DataFrame:
     last_err = None
     for url in SYMBOL_CSV_URLS:
         try:
-            r = requests.get(url, headers=headers, timeout=timeout)
+            r = transport.session().get(url, headers=headers, timeout=timeout)
             r.raise_for_status()
             df = pd.read_csv(io.BytesIO(r.content))
             # normalize
@@ -91,7 +93,7 @@ def choose_stock(df: pd.DataFrame) -> str:
 
 def warm_nse_session(symbol: Optional[str] = None, warm_corp: bool = False) -> requests.Session:
     """Pretend to be a browser + warm cookies so NSE APIs behave."""
-    s = requests.Session()
+    s = transport.session()
     s.headers.update({
         "User-Agent": UA,
         "Accept": "application/json,text/plain,*/*",
@@ -124,9 +126,9 @@ def warm_nse_session(symbol: Optional[str] = None, warm_corp: bool = False) -> r
 
     return s
 
-def get_live_price_nse(symbol: str) -> Optional[float]:
-    """Fetch live LTP from NSE quote API (simple retries)."""
-    s = warm_nse_session(symbol)
+def get_live_price_nse(symbol: str, session: Optional[requests.Session] = None) -> Optional[float]:
+    """Fetch live LTP from NSE quote API (simple retries). Pass a warmed session to reuse it."""
+    s = session or warm_nse_session(symbol)
     url = f"https://www.nseindia.com/api/quote-equity?symbol={symbol}"
     for _ in range(3):
         try:
@@ -171,8 +173,20 @@ def normalize_history_df(df: pd.DataFrame, ysym: str) -> pd.DataFrame:
 def fetch_history_yahoo(symbol: str, period="6mo", interval="1d") -> Optional[pd.DataFrame]:
     """6-month daily candles for plotting a simple line chart."""
     ysym = f"{symbol}.NS"
+    # daily bars come from the shared local store (same raw data the scanner reads)
+    m = re.fullmatch(r"(\d+)(d|mo|y)", period)
+    if interval == "1d" and m:
+        n, unit = int(m.group(1)), m.group(2)
+        offset = {"d": pd.DateOffset(days=n), "mo": pd.DateOffset(months=n), "y": pd.DateOffset(years=n)}[unit]
+        try:
+            df = daily_bars(symbol, adjust="splits")
+        except Exception:
+            df = None
+        if df is not None and not df.empty:
+            df = df[df.index > df.index[-1] - offset]
+            return None if df.empty else df
     try:
-        raw = yf.download(ysym, period=period, interval=interval, auto_adjust=False, progress=False)
+        raw = transport.download(ysym, period=period, interval=interval, auto_adjust=False, progress=False)
         if raw is None or raw.empty:
             return None
         df = normalize_history_df(raw, ysym)
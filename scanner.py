@@ -2,14 +2,16 @@
 # Simple NSE idea scanner (v1)
 # - Universe: NIFTY50 (edit UNIVERSE to add more)
 # - Metrics: 6m return, distance to 52w high, RSI(14), SMA50/200
+# - Data-quality pass over all histories first; low-quality symbols are skipped
 # - Output: prints Top 15 + momentum candidates, saves scanner_output.csv
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
-import yfinance as yf
 from tqdm import tqdm
 
+from data_quality import MIN_QUALITY, quality_pass
+from history_store import daily_bars
+
 # ---------- Config ----------
 NIFTY50 = [
     "RELIANCE","TCS","HDFCBANK","ICICIBANK","INFY","ITC","HINDUNILVR","LT","SBIN","AXISBANK",
@@ -23,6 +25,7 @@ UNIVERSE = NIFTY50         # <- put your own list here later
 NEAR_HIGH_PCT = 5.0        # within 5% of 52w high counts as "near"
 MIN_BARS = 150        # need enough history for SMA200/RSI
 WORKERS = 4
+QUALITY_REPAIR = "ffill"   # "ffill", "drop" or None (flag only)
 
 # ---------- Indicators ----------
 def rsi(series: pd.Series, period: int = 14) -> pd.Series:
@@ -35,57 +38,23 @@ def rsi(series: pd.Series, period: int = 14) -> pd.Series:
     return 100 - (100 / (1 + rs))
 
 def fetch_1y(symbol: str) -> pd.DataFrame | None:
-    ysym = f"{symbol}.NS"
-    for attempt in range(3):
-        try:
-            raw = yf.download(
-                ysym, period="1y", interval="1d",
-                auto_adjust=True, progress=False, threads=False
-            )
-            # fallback: grab 2y then slice last ~260 trading days
-            if raw is None or raw.empty:
-                raw = yf.download(
-                    ysym, period="2y", interval="1d",
-                    auto_adjust=True, progress=False, threads=False
-                )
-            if raw is None or raw.empty:
-                time.sleep(0.6)
-                continue
-
-            # Normalize MultiIndex columns if present
-            if isinstance(raw.columns, pd.MultiIndex):
-                try:
-                    if ysym in raw.columns.get_level_values(-1):
-                        raw = raw.xs(ysym, axis=1, level=-1)
-                    else:
-                        raw.columns = raw.columns.get_level_values(0)
-                except Exception:
-                    raw.columns = raw.columns.get_level_values(0)
-
-            # Keep needed cols and sanitize
-            keep = [c for c in ["Open","High","Low","Close","Volume"] if c in raw.columns]
-            if not keep:
-                time.sleep(0.3); continue
-
-            df = raw[keep].sort_index().copy()
-            for c in keep:
-                df[c] = pd.to_numeric(df[c], errors="coerce")
-            df = df.dropna()
-
-            # If we fetched 2y, trim to last ~260 trading days
-            if len(df) > 320:
-                df = df.iloc[-260:]
-
-            return df if len(df) >= MIN_BARS else None
-        except Exception:
-            time.sleep(0.6)
-            continue
-    return None
-
-def compute_metrics(symbol: str) -> dict | None:
-    df = fetch_1y(symbol)
+    # raw bars live in the shared local store; adjusted (splits + dividends) on read
+    df = daily_bars(symbol, adjust="all")
     if df is None or df.empty:
         return None
+    df = df[["Open","High","Low","Close","Volume"]].dropna()
+
+    # store keeps ~2y, trim to last ~260 trading days
+    if len(df) > 320:
+        df = df.iloc[-260:]
+
+    return df if len(df) >= MIN_BARS else None
+
+def compute_metrics(symbol: str, df: pd.DataFrame | None = None) -> dict | None:
+    if df is None:
+        df = fetch_1y(symbol)
+    if df is None or len(df) < MIN_BARS:
+        return None
 
     close = df["Close"]
     last = float(close.iloc[-1])
@@ -114,15 +83,29 @@ def compute_metrics(symbol: str) -> dict | None:
     }
 
 def scan(symbols: list[str]) -> pd.DataFrame:
-    rows = []
+    frames = {}
     with ThreadPoolExecutor(max_workers=WORKERS) as ex:
-        futures = {ex.submit(compute_metrics, s): s for s in symbols}
-        for fut in tqdm(as_completed(futures), total=len(futures), desc="Scanning"):
+        futures = {ex.submit(fetch_1y, s): s for s in symbols}
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="Fetching"):
             try:
-                r = fut.result()
-                if r: rows.append(r)
+                df = fut.result()
+                if df is not None: frames[futures[fut]] = df
             except Exception:
                 pass
+    frames, quality = quality_pass(frames, repair_how=QUALITY_REPAIR, min_score=MIN_QUALITY)
+    skipped = int(quality["excluded"].sum()) if not quality.empty else 0
+    if skipped:
+        print(f"Skipped {skipped} symbol(s) below quality {MIN_QUALITY:.2f}")
+
+    rows = []
+    for s, df in frames.items():
+        try:
+            r = compute_metrics(s, df)
+            if r:
+                r["quality_score"] = float(quality.at[s, "quality_score"])
+                rows.append(r)
+        except Exception:
+            pass
     if not rows:
         return pd.DataFrame()
     df = pd.DataFrame(rows)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# Record/replay transport (v1)
+# - live   : normal network access (default)
+# - record : hit the network and write every response into ARCHIVE (sqlite, zlib-compressed)
+# - replay : serve responses from ARCHIVE only, never touch the network
+# Pick the mode with env vars, e.g.
+#   NSE_TRANSPORT=record python scanner.py
+#   NSE_TRANSPORT=replay NSE_ARCHIVE=traffic.sqlite python scanner.py
+# NSE traffic is captured per HTTP request via a requests adapter mounted on
+# sessions from session(). Yahoo is captured at the yf.download() call (its
+# curl_cffi session and cookie/crumb handshake can't take a requests adapter),
+# keyed by the call arguments and stored as a pickled DataFrame.
+# Record/replay also point the local history store at <archive>_history/, so a
+# replay starts from the same store state the recording saw. A record session
+# starts a fresh archive (and store) unless NSE_ARCHIVE_APPEND=1.
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+import requests
+import yfinance as yf
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# ---------- Config ----------
+MODE = os.environ.get("NSE_TRANSPORT", "live").strip().lower()
+ARCHIVE_PATH = os.environ.get("NSE_ARCHIVE", "traffic.sqlite")
+SIMULATE_LATENCY = os.environ.get("NSE_SIMULATE_LATENCY", "") not in {"", "0"}
+APPEND = os.environ.get("NSE_ARCHIVE_APPEND", "") not in {"", "0"}
+MODES = {"live", "record", "replay"}
+
+
+# ---------- Archive ----------
+class Archive:
+    """
+    Indexed response archive. Each key may hold several responses (retries, polling);
+    replay serves them in recorded order and repeats the last one once exhausted.
+    On open in replay mode everything is loaded into memory.
+    Opening in record mode wipes previous responses and the archive's history store,
+    unless append=True (then new responses queue after the old ones).
+    """
+
+    def __init__(self, path: str, mode: str, append: bool = False):
+        if mode == "replay" and not os.path.exists(path):
+            raise FileNotFoundError(f"No traffic archive at {path}. Record one first (NSE_TRANSPORT=record).")
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT NOT NULL, seq INTEGER NOT NULL,
+                status INTEGER, headers BLOB, body BLOB, latency REAL,
+                PRIMARY KEY (key, seq));
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.seen: dict[str, int] = {}
+        self.entries: dict[str, list[tuple]] = {}
+        if mode == "record":
+            if not append:
+                self.db.execute("DELETE FROM responses")
+                shutil.rmtree(_history_for(path), ignore_errors=True)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('recorded_at', ?)", (str(time.time()),))
+            self.db.commit()
+            for key, n in self.db.execute("SELECT key, MAX(seq) + 1 FROM responses GROUP BY key"):
+                self.seen[key] = n
+        else:
+            for key, status, headers, body, latency in self.db.execute(
+                    "SELECT key, status, headers, body, latency FROM responses ORDER BY key, seq"):
+                self.entries.setdefault(key, []).append((status, headers, body, latency))
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'recorded_at'").fetchone()
+        self.recorded_at = float(row[0]) if row else None
+
+    def put(self, key: str, status: int, headers: dict, body: bytes, latency: float):
+        with self.lock:
+            seq = self.seen.get(key, 0)
+            self.seen[key] = seq + 1
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                            (key, seq, status, zlib.compress(pickle.dumps(dict(headers))),
+                             zlib.compress(body), latency))
+            self.db.commit()
+
+    def get(self, key: str) -> Optional[tuple[int, dict, bytes, float]]:
+        items = self.entries.get(key)
+        if not items:
+            return None
+        with self.lock:
+            i = self.seen.get(key, 0)
+            self.seen[key] = i + 1
+        status, headers, body, latency = items[min(i, len(items) - 1)]
+        if SIMULATE_LATENCY and latency:
+            time.sleep(latency)
+        return status, pickle.loads(zlib.decompress(headers)), zlib.decompress(body), latency
+
+
+_archive: Optional[Archive] = None
+_archive_lock = threading.Lock()
+
+
+def archive() -> Optional[Archive]:
+    global _archive
+    if MODE == "live":
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = Archive(ARCHIVE_PATH, MODE, APPEND)
+    return _archive
+
+
+def set_mode(mode: str, path: Optional[str] = None, simulate_latency: Optional[bool] = None,
+             append: Optional[bool] = None):
+    """Switch mode in-process (closes the current archive)."""
+    global MODE, ARCHIVE_PATH, SIMULATE_LATENCY, APPEND, _archive
+    mode = mode.strip().lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown transport mode {mode!r}; expected one of {sorted(MODES)}")
+    with _archive_lock:
+        if _archive is not None:
+            _archive.db.close()
+            _archive = None
+        MODE = mode
+        if path:
+            ARCHIVE_PATH = path
+        if simulate_latency is not None:
+            SIMULATE_LATENCY = simulate_latency
+        if append is not None:
+            APPEND = append
+
+
+def sleep(seconds: float):
+    """time.sleep() for retry back-off; a no-op in replay (recorded failures cost no wall time)."""
+    if MODE != "replay":
+        time.sleep(seconds)
+
+
+def history_dir(default: str) -> str:
+    """Local history store for the current mode: live uses default, record/replay one tied to the archive."""
+    if MODE == "live":
+        return default
+    return _history_for(ARCHIVE_PATH)
+
+
+def _history_for(archive_path: str) -> str:
+    return os.path.splitext(archive_path)[0] + "_history"
+
+
+def now(tz=None) -> datetime:
+    """Wall clock, or the recording time while replaying (keeps date cutoffs reproducible)."""
+    a = archive()
+    if a is not None and a.mode == "replay" and a.recorded_at is not None:
+        return datetime.fromtimestamp(a.recorded_at, tz)
+    return datetime.now(tz)
+
+
+# ---------- HTTP (requests sessions) ----------
+def _http_key(request: requests.PreparedRequest) -> str:
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    return f"http {request.method} {request.url} {zlib.crc32(body):08x}"
+
+
+class ArchiveAdapter(HTTPAdapter):
+    """requests adapter that records through to the network or replays from the archive."""
+
+    def send(self, request, **kwargs):
+        a = archive()
+        key = _http_key(request)
+        if a.mode == "replay":
+            hit = a.get(key)
+            if hit is None:
+                raise requests.ConnectionError(f"Not in archive (replay mode): {request.method} {request.url}",
+                                               request=request)
+            status, headers, body, latency = hit
+            r = requests.Response()
+            r.status_code = status
+            r.headers = CaseInsensitiveDict(headers)
+            r._content = body
+            r.url = request.url
+            r.request = request
+            r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+            r.reason = "Replayed"
+            r.elapsed = pd.Timedelta(seconds=latency or 0.0).to_pytimedelta()
+            return r
+        r = super().send(request, **kwargs)
+        a.put(key, r.status_code, r.headers, r.content, r.elapsed.total_seconds())
+        return r
+
+
+def session() -> requests.Session:
+    """requests.Session wired to the current transport mode."""
+    s = requests.Session()
+    if MODE != "live":
+        adapter = ArchiveAdapter()
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+    return s
+
+
+# ---------- Yahoo ----------
+def download(*args, **kwargs) -> Optional[pd.DataFrame]:
+    """Drop-in for yf.download() that records/replays the returned frame."""
+    a = archive()
+    if a is None:
+        return yf.download(*args, **kwargs)
+    key = "yf.download " + repr((args, sorted(kwargs.items())))
+    if a.mode == "replay":
+        hit = a.get(key)
+        return pd.DataFrame() if hit is None else pickle.loads(hit[2])
+    t0 = time.perf_counter()
+    df = yf.download(*args, **kwargs)
+    a.put(key, 200, {}, pickle.dumps(df), time.perf_counter() - t0)
+    return df